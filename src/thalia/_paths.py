@@ -0,0 +1,35 @@
+"""
+Copyright (C) 2025 Narendra S
+
+This file is a part of the Thalia project
+
+Thalia is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Thalia is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Thalia.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from functools import cache
+from pathlib import Path
+
+from platformdirs import user_cache_path, user_config_path
+
+
+@cache
+def config_dir() -> Path:
+    """The directory Thalia reads its configuration from by default."""
+    return user_config_path("thalia")
+
+
+@cache
+def cache_dir() -> Path:
+    """The directory Thalia keeps its caches in by default."""
+    return user_cache_path("thalia")
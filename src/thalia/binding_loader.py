@@ -17,24 +17,47 @@ You should have received a copy of the GNU General Public License
 along with Thalia.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from textual.binding import BindingType
+from __future__ import annotations
 
-from . import cli, config
+import functools
+import operator
+from typing import TYPE_CHECKING, cast
+
+from . import cli
+
+if TYPE_CHECKING:
+    from textual.binding import Binding, BindingType
+
+    from . import config
+
+
+@functools.cache
+def _getter(field: str) -> operator.attrgetter:
+    """A compiled getter for a dotted settings path, built once per path."""
+    return operator.attrgetter(field)
 
 
 def include_bindings(field: str) -> list[BindingType]:
     """Get the bindings for a given field in the settings.
-    Argument field must point to a field with type signature config.ScreenBindings"""
-
-    fields = field.split(".")
-    tmp_internal_field = cli.get_settings()
-    while fields:
-        if fields[0] not in tmp_internal_field.__pydantic_fields__:
-            return []
-
-        tmp_internal_field = getattr(tmp_internal_field, fields[0])
-        fields.pop(0)
-    if isinstance(tmp_internal_field, config.ScreenBindings):
-        return list(tmp_internal_field.get_bindings())
+    Argument field must point to a field with type signature config.ScreenBindings
+
+    Textual merges BINDINGS from the class __dict__ while the class is being created, so this can't be
+    deferred with a descriptor. Modules calling this from a class body should only be imported once a
+    command needs them (see cli.tui), which keeps the work off the --help/--version paths."""
+
+    return _resolve_bindings(cli.get_settings(), field)
+
+
+def _resolve_bindings(settings: config.Settings, field: str) -> list[BindingType]:
+    try:
+        node = _getter(field)(settings)
+    except AttributeError:
+        return []
+
+    # duck-typed so this module doesn't need to import config (and with it pydantic) just for an isinstance check
+    get_bindings = getattr(node, "get_bindings", None)
+    if callable(get_bindings):
+        # the tuple is cached on the ScreenBindings itself, textual declares BINDINGS as a list so hand it a copy
+        return list(cast("tuple[Binding, ...]", get_bindings()))
 
     return []
@@ -17,18 +17,97 @@ You should have received a copy of the GNU General Public License
 along with Thalia.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+from __future__ import annotations
+
+import functools
 import os
+import pickle
 import sqlite3
+from importlib import metadata
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 import click
 from click_default_group import DefaultGroup
-from platformdirs import user_cache_path, user_config_path
 from rich import print
 
-from . import config as conf
+from . import _paths
+
+if TYPE_CHECKING:
+    # config pulls in pydantic and textual, only import it once a command actually needs the settings
+    from . import config as conf
 
 CONTEXT_SETTINGS = {"help_option_names": ["-h", "--help"]}
 
+_SETTINGS: conf.Settings | None = None
+"""The settings loaded by the cli callback, read through get_settings"""
+
+
+@functools.cache
+def default_config_file() -> Path:
+    """Path to the configuration file used when none is given."""
+    return _paths.config_dir() / "config.toml"
+
+
+class _ConfigOption(click.Option):
+    """The --config option, only looks up the default config file when the help text is rendered."""
+
+    def get_help_record(self, ctx: click.Context) -> tuple[str, str] | None:
+        record = super().get_help_record(ctx)
+        if record is None:
+            return None
+        return record[0], f"{record[1]} (defaults to {default_config_file()})"
+
+
+def _settings_cache_key(config_path: Path) -> tuple:
+    """Everything a parsed Settings object depends on, used to tell if a cached copy is still fresh."""
+    from . import config as conf
+
+    # pydantic-settings matches the prefix case-insensitively, so thalia_* variables count too
+    env = tuple(sorted((k, v) for k, v in os.environ.items() if k.upper().startswith("THALIA_")))
+    # a pickle from another version may not even load, or load into a differently shaped model
+    versions: list[str | None] = []
+    for dist in ("textual-thalia", "pydantic", "pydantic-settings", "textual"):
+        try:
+            versions.append(metadata.version(dist))
+        except metadata.PackageNotFoundError:
+            versions.append(None)
+    stamps: list[tuple[str, int | None]] = []
+    for path in (config_path, Path(".env").resolve(), Path(conf.__file__)):
+        try:
+            stamps.append((str(path), os.stat(path).st_mtime_ns))
+        except OSError:
+            stamps.append((str(path), None))
+    return env, tuple(versions), tuple(stamps)
+
+
+def load_settings(config_path: Path, cache_file: Path) -> conf.Settings:
+    """Load the settings, reusing the pickled copy in cache_file if none of its inputs changed."""
+    from . import config as conf
+
+    key = _settings_cache_key(config_path)
+    try:
+        with cache_file.open("rb") as f:
+            cached_key, settings = pickle.load(f)
+        if cached_key == key and isinstance(settings, conf.Settings):
+            # validators don't run on unpickling, make sure the directories still exist
+            settings.ensure_dirs()
+            return settings
+    except Exception:
+        # missing, unreadable or incompatible cache (unpickling can raise nearly anything), rebuild it below
+        pass
+
+    settings = conf.Settings()
+    # write to a temporary file first so a concurrent reader never sees a partial pickle
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with tmp_file.open("wb") as f:
+            pickle.dump((key, settings), f)
+        os.replace(tmp_file, cache_file)
+    except (OSError, pickle.PickleError):
+        tmp_file.unlink(missing_ok=True)
+    return settings
+
 
 @click.group(
     cls=DefaultGroup,
@@ -45,26 +124,27 @@ CONTEXT_SETTINGS = {"help_option_names": ["-h", "--help"]}
 @click.option(
     "-c",
     "--config",
-    help=f"Path to the configuration file (defaults to {user_config_path('thalia') / 'config.toml'})",
+    cls=_ConfigOption,
+    help="Path to the configuration file",
 )
 @click.option("--cache-dir", help="Path to the cache directory to use")
 @click.pass_context
 def cli(ctx, config, cache_dir):
     """Thalia CLI"""
+    global _SETTINGS
     ctx.ensure_object(dict)
 
     if config is not None:
         # If a config file is mentioned set the config file environment variable to override the default config
         os.environ["THALIA_CONFIG_FILE"] = str(config)
-    ctx.obj["settings"] = conf.Settings()
-    ctx.obj["config_path"] = config or user_config_path("thalia") / "config.toml"
-
-    if cache_dir is None:
-        cache_dir = ctx.obj["cache_dir"] = user_cache_path("thalia")
+    config_path = ctx.obj["config_path"] = Path(config) if config is not None else default_config_file()
 
+    cache_dir = ctx.obj["cache_dir"] = Path(cache_dir) if cache_dir is not None else _paths.cache_dir()
     if not cache_dir.exists():
         cache_dir.mkdir(parents=True)
 
+    _SETTINGS = ctx.obj["settings"] = load_settings(config_path, cache_dir / "settings.pkl")
+
 
 @cli.command(context_settings=CONTEXT_SETTINGS)
 @click.pass_context
@@ -74,16 +154,33 @@ def tui(ctx):
 
     db_path = ctx.obj["cache_dir"] / "cache.db"
     try:
-        db = sqlite3.connect(db_path, timeout=3)
+        # the dashboard runs its queries through asyncio.to_thread, so the connection is shared with worker threads
+        db = sqlite3.connect(db_path, timeout=3, check_same_thread=False)
     except sqlite3.OperationalError:
         print("[red]Unable to open cache database. Exiting.[/red]")
         exit(1)
 
-    thalia = ctx.obj["app"] = app.Thalia(ctx.obj["settings"], db, ctx.obj["cache_dir"])
+    try:
+        thalia = ctx.obj["app"] = app.Thalia(ctx.obj["settings"], db, ctx.obj["cache_dir"])
+    except app.ThaliaCacheError as e:
+        print(f"[red]{e}. Exiting.[/red]")
+        exit(1)
     thalia.run()
+    thalia.flush_recent_repos()
+
+    try:
+        # let sqlite refresh its query planner statistics if they are stale, cheap when they aren't
+        db.execute("PRAGMA optimize")
+        db.close()
+    except sqlite3.OperationalError:
+        pass
 
 
-@click.pass_context
-def get_settings(ctx) -> conf.Settings:
-    """Get the settings object from the context."""
-    return ctx.obj["settings"]
+def get_settings() -> conf.Settings:
+    """Get the settings loaded by the cli, or load them from the environment when used as a library."""
+    global _SETTINGS
+    if _SETTINGS is None:
+        from . import config as conf
+
+        _SETTINGS = conf.Settings()
+    return _SETTINGS
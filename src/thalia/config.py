@@ -19,18 +19,18 @@ along with Thalia.  If not, see <https://www.gnu.org/licenses/>.
 
 from __future__ import annotations
 
+import functools
 import os
 from collections.abc import Iterator
 from pathlib import Path
 
-from platformdirs import user_config_path
-from pydantic import BaseModel, Field, PrivateAttr, field_validator
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator, model_validator
 from pydantic_settings import BaseSettings, PydanticBaseSettingsSource, SettingsConfigDict, TomlConfigSettingsSource
-from rich.errors import StyleSyntaxError
-from rich.style import Style
-from textual.binding import Binding, BindingError, InvalidBinding
+from textual.binding import Binding
 from textual.keys import _character_to_key
 
+from . import _paths
+
 
 class BindingTypeModel(BaseModel):
     key: str | tuple[str, str] | tuple[str, str, str] = Field()
@@ -42,6 +42,24 @@ class BindingTypeModel(BaseModel):
     show: bool = Field(True)
     """Whether to show keybind in footer or not"""
 
+    model_config = ConfigDict(frozen=True)
+
+    _expanded_keys: tuple[str, ...] = PrivateAttr(())
+    """The individual textual keys this binding expands to"""
+
+    @model_validator(mode="after")
+    def expand_keys(self) -> BindingTypeModel:
+        """Splits the keybind into its individual keys once, so building bindings is a plain loop."""
+        binding_key = ",".join(self.key) if isinstance(self.key, tuple) else self.key
+        keys: list[str] = []
+        for key in binding_key.split(","):
+            key = key.strip()
+            if not key:
+                raise ValueError(f"Can not bind empty string in {binding_key!r}")
+            keys.append(_character_to_key(key) if len(key) == 1 else key)
+        self._expanded_keys = tuple(keys)
+        return self
+
 
 class ScreenBindings(BaseModel):
     bindings: list[BindingTypeModel] = Field()
@@ -49,35 +67,39 @@ class ScreenBindings(BaseModel):
 
     _actions: dict[str, str] = PrivateAttr({})
 
+    _compiled_bindings: tuple[Binding, ...] | None = PrivateAttr(None)
+    """Bindings built by get_bindings, reset whenever the model is (re)validated"""
+
+    model_config = ConfigDict(validate_assignment=True)
+
     @field_validator("bindings")
     @classmethod
     def validate_bindings(cls, bindings: list[BindingTypeModel]) -> list[BindingTypeModel]:
         """Validates and filters bindings based on the defined actions."""
         # the type checker still thinks this is a dict and not a Field wrapping a dict
-        return [binding for binding in bindings if cls._actions.get_default().get(binding.action) is not None]  # type: ignore
-
-    def get_bindings(self) -> Iterator[Binding]:
-        """Modified version of textual.binding.Binding.make_bindings classmethod"""
-        bindings = self.bindings
-        for binding in bindings:
-            _binding: Binding
-            if isinstance(binding.key, tuple):
-                if len(binding.key) not in (2, 3):
-                    raise BindingError(f"BINDINGS must contain a tuple of two or three strings, not {binding!r}")
-                _binding = Binding(",".join(binding.key), action=binding.action)
-            else:
-                _binding = Binding(binding.key, action=binding.action)
-
-            for key in _binding.key.split(","):
-                key = key.strip()
-                if not key:
-                    raise InvalidBinding(f"Can not bind empty string in {_binding.key!r}")
-                if len(key) == 1:
-                    key = _character_to_key(key)
-
-                yield Binding(
-                    key=key, action=binding.action, description=self._actions[binding.action], show=binding.show
-                )
+        actions = cls._actions.get_default()  # type: ignore
+        return [binding for binding in bindings if binding.action in actions]
+
+    @model_validator(mode="after")
+    def reset_compiled_bindings(self) -> ScreenBindings:
+        """Discard the compiled bindings so they are rebuilt from the current ones."""
+        self._compiled_bindings = None
+        return self
+
+    def get_bindings(self) -> tuple[Binding, ...]:
+        """Modified version of textual.binding.Binding.make_bindings classmethod, built once and cached"""
+        if self._compiled_bindings is None:
+            self._compiled_bindings = tuple(self._make_bindings())
+        return self._compiled_bindings
+
+    def _make_bindings(self) -> Iterator[Binding]:
+        _Binding = Binding
+        actions = self._actions
+
+        for binding in self.bindings:
+            description = actions[binding.action]
+            for key in binding._expanded_keys:
+                yield _Binding(key=key, action=binding.action, description=description, show=binding.show)
 
 
 class DashboardSettings(BaseModel):
@@ -99,6 +121,9 @@ class DashboardSettings(BaseModel):
     @classmethod
     def check_style(cls, text_style: str) -> str:
         """Validator for text style"""
+        from rich.errors import StyleSyntaxError
+        from rich.style import Style
+
         try:
             Style.parse(text_style)
         except StyleSyntaxError:
@@ -163,6 +188,12 @@ class GlobalBindings(ScreenBindings):
     _actions = {"quit": "Quit", "help": "Toggle Help"}
 
 
+@functools.lru_cache(maxsize=4)
+def _toml_source(settings_cls: type[BaseSettings], path: Path, mtime_ns: int) -> TomlConfigSettingsSource:
+    """Parse a config file once per modification, the mtime is only part of the cache key."""
+    return TomlConfigSettingsSource(settings_cls, path)
+
+
 class Settings(BaseSettings):
     """Settings for the Thalia application."""
 
@@ -182,25 +213,35 @@ class Settings(BaseSettings):
     )
     """Global keybinds"""
 
-    config_dir: Path = Field(default_factory=lambda: user_config_path("thalia"))
+    config_dir: Path = Field(default_factory=_paths.config_dir)
     """The directory where Thalia stores its data."""
 
-    theme_dir: Path = Field(default_factory=lambda: user_config_path("thalia") / "themes")
+    theme_dir: Path = Field(default_factory=lambda: _paths.config_dir() / "themes")
     """The directory where Thalia stores its themes."""
 
-    config_file: Path = Field(default_factory=lambda: user_config_path("thalia") / "config.toml")
+    config_file: Path = Field(default_factory=lambda: _paths.config_dir() / "config.toml")
     """The path to the Thalia configuration file."""
 
     @field_validator("config_dir", "theme_dir", "config_file")
     @classmethod
     def validate_paths(cls, path: Path) -> Path:
-        """Ensures the provided paths are absolute and exist."""
+        """Ensures the provided paths are absolute."""
         if not path.is_absolute():
             raise ValueError(f"Path {path} must be absolute.")
-        if not path.exists():
-            path.mkdir(parents=True, exist_ok=True)
         return path
 
+    @model_validator(mode="after")
+    def create_dirs(self) -> Settings:
+        """Creates the configured directories, and the parent directory of the config file."""
+        self.ensure_dirs()
+        return self
+
+    def ensure_dirs(self) -> None:
+        """Create the configured directories if they are missing, also used for settings loaded from a pickle."""
+        # theme_dir and the config file usually live inside config_dir, only create each directory once
+        for directory in {self.config_dir, self.theme_dir, self.config_file.parent}:
+            os.makedirs(directory, exist_ok=True)
+
     model_config = SettingsConfigDict(
         env_prefix="THALIA_",
         env_nested_delimiter=":",
@@ -228,17 +269,19 @@ class Settings(BaseSettings):
             file_secret_settings,
         )
 
-        if config_from_env:
-            conf_file = Path(config_from_env).resolve()
-        else:
+        if not config_from_env:
+            return default_sources
+
+        conf_file = Path(config_from_env).resolve()
+        try:
+            mtime_ns = os.stat(conf_file).st_mtime_ns
+        except OSError:
             return default_sources
 
-        if conf_file.exists():
-            return (
-                init_settings,
-                TomlConfigSettingsSource(settings_cls, conf_file),
-                env_settings,
-                dotenv_settings,
-                file_secret_settings,
-            )
-        return default_sources
+        return (
+            init_settings,
+            _toml_source(settings_cls, conf_file, mtime_ns),
+            env_settings,
+            dotenv_settings,
+            file_secret_settings,
+        )
@@ -17,16 +17,34 @@ You should have received a copy of the GNU General Public License
 along with Thalia.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import asyncio
 import sqlite3
+import threading
+import time
 from pathlib import Path
 
-from platformdirs import user_cache_path
+from textual import work
 from textual.app import App
 from textual.widgets import HelpPanel
 
-from .. import binding_loader
+from .. import _paths, binding_loader
 from .. import config as conf
-from .screens import dashboard
+
+CACHE_SCHEMA_VERSION = 1
+"""Bumped whenever the cache schema changes, stored in the database's user_version"""
+
+RECENT_REPO_WRITE_DELAY = 0.2
+"""Seconds to wait for more recently opened repositories before writing them out together"""
+
+RECENT_REPO_TOUCH_INTERVAL = 5
+"""Seconds within which reopening the most recently opened repository doesn't update the cache again"""
+
+SQLITE_MAX_PARAMS = 999
+"""The lowest limit on bound parameters per statement across SQLite builds"""
+
+
+class ThaliaCacheError(Exception):
+    """Raised when the cache database can't be set up."""
 
 
 class Thalia(App):
@@ -47,31 +65,147 @@ class Thalia(App):
 
     BINDINGS = binding_loader.include_bindings("bindings")
 
+    # kept as constants so every call hands sqlite3 the same string and hits its per-connection statement cache
+    SQL_TOUCH_REPO = "UPDATE Repositories SET last_accessed=? WHERE Path=?;"
+    SQL_INSERT_REPO = "INSERT OR IGNORE INTO Repositories(Path, last_accessed) VALUES (?, ?);"
+    SQL_SELECT_RECENT = "SELECT Path FROM Repositories ORDER BY last_accessed DESC LIMIT ? OFFSET ?;"
+
     def __init__(
         self, settings: conf.Settings, cache_db: sqlite3.Connection, cache_dir: Path | None = None, **kwargs
     ) -> None:
         """Initialize the Thalia app."""
-        self.settings = settings
-        self.cache_dir = cache_dir or user_cache_path("thalia")
-        self.cache_db = cache_db
-
         try:
-            with cache_db:
-                schema = """
-                CREATE TABLE IF NOT EXISTS Repositories(
-                    Path TEXT PRIMARY KEY NOT NULL UNIQUE,
-                    last_accessed INTEGER NOT NULL DEFAULT (strftime('%s','now'))
-                )
-                """
-                cache_db.execute(schema)
-        except sqlite3.OperationalError:
-            exit(1)
+            # the cache can always be rebuilt, so trade durability for not fsyncing on every write
+            cache_db.execute("PRAGMA journal_mode=WAL")
+            cache_db.execute("PRAGMA synchronous=NORMAL")
+            cache_db.execute("PRAGMA temp_store=MEMORY")
+            # ~20MB page cache and a 256MB memory map, the cache rarely gets anywhere near either
+            cache_db.execute("PRAGMA cache_size=-20000")
+            cache_db.execute("PRAGMA mmap_size=268435456")
+
+            # skip the schema statements entirely on warm starts
+            if cache_db.execute("PRAGMA user_version").fetchone()[0] < CACHE_SCHEMA_VERSION:
+                with cache_db:
+                    schema = (
+                        """
+                        CREATE TABLE IF NOT EXISTS Repositories(
+                            Path TEXT PRIMARY KEY NOT NULL UNIQUE,
+                            last_accessed INTEGER NOT NULL DEFAULT (strftime('%s','now'))
+                        )
+                        """,
+                        # includes Path so the recent repositories query is answered from the index alone
+                        "CREATE INDEX IF NOT EXISTS idx_repos_recent ON Repositories(last_accessed DESC, Path)",
+                    )
+                    for statement in schema:
+                        cache_db.execute(statement)
+                    cache_db.execute(f"PRAGMA user_version={CACHE_SCHEMA_VERSION}")
+        except sqlite3.OperationalError as e:
+            raise ThaliaCacheError(f"Unable to set up the cache database: {e}") from e
 
         super().__init__(**kwargs)
 
+        self.settings = settings
+        self.cache_dir = cache_dir or _paths.cache_dir()
+        self.cache_db = cache_db
+        # the connection is shared with worker threads, only one of them may use it at a time
+        self.cache_lock = threading.Lock()
+        # set once a repository access was written, so the dashboard knows to reload its recent list
+        self.recent_repos_dirty = False
+        self._pending_repos: asyncio.Queue[str] = asyncio.Queue()
+        # the batch the writer has taken off the queue, kept until it's committed so an exit can't lose it
+        self._writing_repos: list[str] = []
+        # the last repository queued for writing and when, to drop repeated opens of the same one
+        self._last_recorded: tuple[str, float] | None = None
+        # recent repositories found to no longer be valid, removed from the cache once the app exits
+        self._stale_repos: set[str] = set()
+
     def on_mount(self) -> None:
         """Called when the app is mounted."""
-        self.push_screen(dashboard.DashboardScreen(id="dashboard"))
+        from .screens import dashboard
+
+        self.write_recent_repos()
+        # installed rather than pushed directly so the same instance (and its DOM) is reused when navigating back
+        self.install_screen(dashboard.DashboardScreen(id="dashboard"), "dashboard")
+        self.push_screen("dashboard")
+
+    def record_recent_repo(self, repo_dir: Path) -> None:
+        """Queue an update of a repository's last access time, written out together with any opened alongside it."""
+        path = str(repo_dir)
+        # opened again, e.g. after being recreated, so it isn't stale anymore
+        self._stale_repos.discard(path)
+        now = time.monotonic()
+        last = self._last_recorded
+        if last is not None and last[0] == path and now - last[1] < RECENT_REPO_TOUCH_INTERVAL:
+            # already at the top of the list, writing it again wouldn't change anything shown
+            return
+        self._last_recorded = (path, now)
+        self._pending_repos.put_nowait(path)
+
+    def forget_recent_repos(self, paths: list[str]) -> None:
+        """Mark recent repositories that can no longer be opened, they are deleted from the cache on exit."""
+        self._stale_repos.update(paths)
+
+    @work(group="cache-writer")
+    async def write_recent_repos(self) -> None:
+        """Drain the queue of opened repositories, one transaction per burst."""
+        while True:
+            self._writing_repos.append(await self._pending_repos.get())
+            await asyncio.sleep(RECENT_REPO_WRITE_DELAY)
+            self._writing_repos.extend(self._drain_pending_repos())
+            try:
+                await asyncio.to_thread(self._upsert_repos, list(self._writing_repos))
+                self.recent_repos_dirty = True
+            except sqlite3.OperationalError:
+                self.notify(
+                    title="Failed to insert into cache",
+                    message="Repository might not show up in recently opened list",
+                    severity="warning",
+                )
+            self._writing_repos.clear()
+
+    def flush_recent_repos(self) -> None:
+        """Write out queued repositories and drop stale ones, used once the app has exited and the writer is gone."""
+        # a batch the writer was cancelled on is written again, the upsert doesn't mind repeats
+        paths = self._writing_repos + self._drain_pending_repos()
+        if paths:
+            try:
+                self._upsert_repos(paths)
+                self._writing_repos.clear()
+            except sqlite3.OperationalError:
+                pass
+        if self._stale_repos:
+            try:
+                self._delete_repos(list(self._stale_repos))
+                self._stale_repos.clear()
+            except sqlite3.OperationalError:
+                pass
+
+    def _drain_pending_repos(self) -> list[str]:
+        paths: list[str] = []
+        while not self._pending_repos.empty():
+            paths.append(self._pending_repos.get_nowait())
+        return paths
+
+    def _upsert_repos(self, paths: list[str]) -> None:
+        now = int(time.time())
+        unique = list(dict.fromkeys(paths))
+        # a cancelled writer's thread may still be in its transaction, wait for it instead of nesting one
+        with self.cache_lock, self.cache_db as con:
+            # take the write lock up front instead of upgrading a deferred transaction halfway through
+            con.execute("BEGIN IMMEDIATE")
+            # most opens are of repositories already in the cache, a plain UPDATE covers those without
+            # going through conflict resolution, only insert when some of them were new
+            updated = con.executemany(self.SQL_TOUCH_REPO, ((now, path) for path in unique)).rowcount
+            if updated < len(unique):
+                con.executemany(self.SQL_INSERT_REPO, ((path, now) for path in unique))
+
+    def _delete_repos(self, paths: list[str]) -> None:
+        with self.cache_lock, self.cache_db as con:
+            con.execute("BEGIN IMMEDIATE")
+            for start in range(0, len(paths), SQLITE_MAX_PARAMS):
+                chunk = paths[start : start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                con.execute(f"DELETE FROM Repositories WHERE Path IN ({placeholders});", chunk)
 
     def action_help(self) -> None:
         """Toggle the help panel."""
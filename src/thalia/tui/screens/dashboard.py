@@ -20,8 +20,13 @@ along with Thalia.  If not, see <https://www.gnu.org/licenses/>.
 from __future__ import annotations
 
 import asyncio
+import functools
+import os
 import sqlite3
-from collections.abc import Iterator
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import cast
 
@@ -31,10 +36,10 @@ from textual import on, work
 from textual.app import ComposeResult
 from textual.containers import Horizontal, Vertical
 from textual.content import Content
-from textual.events import Click
 from textual.screen import ModalScreen, Screen
 from textual.widget import Widget
-from textual.widgets import Button, Footer, Input, ListItem, ListView, ProgressBar, Static
+from textual.widgets import Button, Footer, Input, OptionList, ProgressBar, Static
+from textual.widgets.option_list import Option
 from textual_fspicker.parts import DirectoryNavigation
 from textual_fspicker.select_directory import CurrentDirectory, SelectDirectory
 
@@ -42,6 +47,59 @@ from ... import binding_loader
 from .. import app
 from .workspace import WorkspaceScreen
 
+RECENT_REPOS_LIMIT = 50
+"""The number of most recently opened repositories shown on the dashboard"""
+
+REPO_NAME_WIDTH = 40
+"""Repository names longer than this are cut short in the recent repositories list"""
+
+CLONE_PROGRESS_INTERVAL = 1 / 30
+"""Minimum seconds between clone progress bar updates"""
+
+VALIDATION_WORKERS = 8
+"""Threads used to check the recent repositories in parallel"""
+
+# resolved once, Path.home() goes through the environment (and possibly the password database) on every call
+_HOME = Path.home()
+
+# refuse to reinitialise an existing repository, create the directory if needed
+_INIT_FLAGS = pygit2.enums.RepositoryInitFlag.NO_REINIT | pygit2.enums.RepositoryInitFlag.MKDIR
+
+
+def _is_git_dir(path: Path) -> bool:
+    """Check if path looks like a repository from its layout, only opening it with pygit2 when unsure."""
+    git = path / ".git"
+    if git.is_dir():
+        return True
+    # bare repository
+    if not git.exists() and (path / "HEAD").is_file() and (path / "objects").is_dir():
+        return True
+    # gitdir links (worktrees, submodules) and subdirectories of a work tree, which opening searches upwards from,
+    # only libgit2 can tell if those lead to a valid repository
+    try:
+        pygit2.repository.Repository(str(path))
+    except pygit2.GitError:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=256)
+def _validate_repo_path(path_str: str, head_mtime: int | None) -> bool:
+    """Memoized _is_git_dir, the HEAD mtime is part of the key so a changed repository is checked again."""
+    return _is_git_dir(Path(path_str))
+
+
+def _is_empty_dir(path: Path) -> bool:
+    """Check if path is an empty directory or doesn't exist yet, i.e. something can be cloned into it."""
+    try:
+        # stops at the first entry instead of listing the whole directory
+        with os.scandir(path) as entries:
+            return next(entries, None) is None
+    except FileNotFoundError:
+        return True
+    except NotADirectoryError:
+        return False
+
 
 class DashboardScreen(Screen):
     CSS = """
@@ -72,12 +130,16 @@ class DashboardScreen(Screen):
 
     BINDINGS = binding_loader.include_bindings("dashboard.bindings")
 
+    @functools.cached_property
+    def _thalia(self) -> app.Thalia:
+        return cast(app.Thalia, self.app)
+
     def compose(self) -> ComposeResult:
-        _app = cast(app.Thalia, self.app)
+        dashboard = self._thalia.settings.dashboard
         yield Static(
             Text(
-                _app.settings.dashboard.text,
-                _app.settings.dashboard.text_style,
+                dashboard.text,
+                dashboard.text_style,
             ),
             id="dash-name",
         )
@@ -86,19 +148,25 @@ class DashboardScreen(Screen):
             yield RepoActions(id="repo-actions")
         yield Footer()
 
+    def on_screen_resume(self) -> None:
+        # the screen is kept alive between visits, only reload the recent list if something was opened since
+        if self._thalia.recent_repos_dirty:
+            self.query_one(RecentRepos).load_recent_repos()
+
     @work
     async def action_create_repo(self) -> None:
         repo_dir = await self.app.push_screen_wait(CustomDirPicker(title="Select Directory for Repository"))
         if not repo_dir:
             self.notify("No directory selected, exiting.")
             return
-        flags = pygit2.enums.RepositoryInitFlag
         try:
-            repo = pygit2.init_repository(repo_dir, flags=flags.NO_REINIT | flags.MKDIR)
+            repo = await asyncio.to_thread(pygit2.init_repository, repo_dir, flags=_INIT_FLAGS)
         except (pygit2.GitError, ValueError) as e:
             self.notify(title="Repository creation failed", message=e.args[0], severity="error")
             return
 
+        # a repository may have been created where a stale entry was previously found invalid
+        _validate_repo_path.cache_clear()
         self._open_repo_from_obj(repo, repo_dir)
 
     @work
@@ -106,7 +174,7 @@ class DashboardScreen(Screen):
         # TODO: Add a configuration option for default clone directory
         # For now, we use the home directory as the default
 
-        res = await self.app.push_screen_wait(CloneModal(default_dir=Path.home(), dashboard=self))
+        res = await self.app.push_screen_wait(CloneModal(default_dir=_HOME, dashboard=self))
         if res is None:
             return
 
@@ -116,6 +184,7 @@ class DashboardScreen(Screen):
         if not repo:
             return
 
+        _validate_repo_path.cache_clear()
         self._open_repo_from_obj(repo, target_path)
 
     @work
@@ -127,9 +196,10 @@ class DashboardScreen(Screen):
 
         self._open_repo(repo_dir)
 
-    def _open_repo(self, repo_dir: Path) -> None:
+    @work(exclusive=True, group="open-repo")
+    async def _open_repo(self, repo_dir: Path) -> None:
         try:
-            repo = pygit2.repository.Repository(str(repo_dir))
+            repo = await asyncio.to_thread(pygit2.repository.Repository, str(repo_dir))
         except pygit2.GitError as e:
             self.notify(e.args[0], title="Unable to open repository", severity="error")
             return
@@ -137,23 +207,7 @@ class DashboardScreen(Screen):
         self._open_repo_from_obj(repo, repo_dir)
 
     def _open_repo_from_obj(self, repo: pygit2.repository.Repository, repo_dir: Path) -> None:
-        try:
-            with cast(app.Thalia, self.app).cache_db as con:
-                con.execute(
-                    "INSERT INTO Repositories(Path, last_accessed) VALUES"
-                    "(?, strftime('%s','now')) ON CONFLICT(Path) DO UPDATE SET last_accessed=strftime('%s','now')",
-                    (str(repo_dir),),
-                )
-        except sqlite3.OperationalError:
-            self.notify(
-                title="Failed to insert into cache",
-                message="Repository might not show up in recently opened list",
-                severity="warning",
-            )
-        except sqlite3.IntegrityError:
-            # repo already in cache
-            pass
-
+        self._thalia.record_recent_repo(repo_dir)
         self.app.push_screen(WorkspaceScreen(repo))
 
 
@@ -177,54 +231,114 @@ class RepoActions(Widget):
 
 
 class RecentRepos(Widget):
+    @functools.cached_property
+    def _thalia(self) -> app.Thalia:
+        return cast(app.Thalia, self.app)
+
     def compose(self) -> ComposeResult:
-        repos = (RepositoryEntry(x) for x in self.fetch_recent_repos())
         with Vertical():
             yield Static("Recent Repositories")
-            yield ListView(*repos)
+            # OptionList only renders the lines in view, so a long history doesn't mount a widget per entry
+            yield OptionList()
 
-    def fetch_recent_repos(self) -> Iterator[Path]:
-        con = cast(app.Thalia, self.app).cache_db
-        try:
-            query = con.execute("SELECT Path FROM Repositories ORDER BY last_accessed DESC;")
-        except sqlite3.OperationalError:
-            return
-        to_rm: list[str] = []
-        for repo in query.fetchall():
-            repo_path = Path(repo[0])
-            if repo_path.exists() and repo_path.is_dir():
+    def on_mount(self) -> None:
+        self.load_recent_repos()
+
+    @work(exclusive=True)
+    async def load_recent_repos(self) -> None:
+        """Fill the list from the cache without blocking the event loop, then check the entries can be opened."""
+        thalia = self._thalia
+        thalia.recent_repos_dirty = False
+        # fetch everything in one trip to the thread instead of awaiting per row
+        paths = await asyncio.to_thread(self._fetch_locked, thalia.cache_lock, thalia.cache_db)
+        option_list = self.query_one(OptionList)
+        option_list.clear_options()
+        option_list.add_options(RepositoryEntry(path) for path in paths)
+        await self._prune_recent_repos(option_list)
+
+    @classmethod
+    def _fetch_locked(cls, lock: threading.Lock, con: sqlite3.Connection) -> list[Path]:
+        with lock:
+            return cls.fetch_recent_repos(con)
+
+    @staticmethod
+    def fetch_recent_repos(con: sqlite3.Connection) -> list[Path]:
+        """The most recent repository directories that currently exist, newest first."""
+        paths: list[Path] = []
+        offset = 0
+        # missing paths stay in the cache (e.g. an unmounted drive), so page past them until the list is full
+        while len(paths) < RECENT_REPOS_LIMIT:
+            try:
+                rows = con.execute(app.Thalia.SQL_SELECT_RECENT, (RECENT_REPOS_LIMIT, offset)).fetchall()
+            except sqlite3.OperationalError:
+                break
+            for (path_str,) in rows:
+                # a single stat instead of the two done by Path.exists and Path.is_dir
                 try:
-                    pygit2.repository.Repository(repo[0])
-                    yield Path(repo[0])
-                except pygit2.GitError:
-                    to_rm.append(repo)
+                    st = os.stat(path_str)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    paths.append(Path(path_str))
+                    if len(paths) == RECENT_REPOS_LIMIT:
+                        break
+            if len(rows) < RECENT_REPOS_LIMIT:
+                break
+            offset += RECENT_REPOS_LIMIT
+        return paths
+
+    async def _prune_recent_repos(self, option_list: OptionList) -> None:
+        """Strike out listed repositories that can no longer be opened and mark them for removal from the cache."""
+        entries = [cast(RepositoryEntry, option_list.get_option_at_index(i)) for i in range(option_list.option_count)]
+        results = await asyncio.to_thread(self._validate_repos, [entry.path for entry in entries])
+
+        to_rm: list[str] = []
+        for index, (entry, valid) in enumerate(zip(entries, results, strict=True)):
+            if not valid:
+                to_rm.append(str(entry.path))
+                option_list.replace_option_prompt_at_index(index, cast(Content, entry.prompt).stylize("strike"))
+                option_list.disable_option_at_index(index)
 
         if not to_rm:
             return
 
-        try:
-            with con:
-                con.executemany("DELETE FROM Repositories WHERE Path=?;", to_rm)
-        except sqlite3.OperationalError:
-            pass
-
-    @on(ListView.Selected)
-    def open_repo(self, event: ListView.Selected) -> None:
+        # removing them from the cache is left to the app, loading the dashboard only ever reads
+        self._thalia.forget_recent_repos(to_rm)
+
+    @classmethod
+    def _validate_repos(cls, paths: list[Path]) -> list[bool]:
+        # a small pool of its own, so the checks overlap without filling the loop's default executor
+        with ThreadPoolExecutor(max_workers=VALIDATION_WORKERS, thread_name_prefix="repo-check") as executor:
+            return list(executor.map(cls._is_valid_repo, paths))
+
+    @staticmethod
+    def _is_valid_repo(path: Path) -> bool:
+        """Check if a repository can be opened, reusing the last result until its HEAD changes."""
+        head_mtime: int | None = None
+        # .git/HEAD for work trees, HEAD for bare repositories
+        for head in (path / ".git" / "HEAD", path / "HEAD"):
+            try:
+                head_mtime = head.stat().st_mtime_ns
+                break
+            except OSError:
+                continue
+        return _validate_repo_path(str(path), head_mtime)
+
+    @on(OptionList.OptionSelected)
+    def open_repo(self, event: OptionList.OptionSelected) -> None:
         event.stop()
-        assert isinstance(event.item, RepositoryEntry)
-        event.item.action_open_repo()
+        assert isinstance(event.option, RepositoryEntry)
+        self.query_ancestor(DashboardScreen)._open_repo(event.option.path)
 
 
-class RepositoryEntry(ListItem):
-    def __init__(self, path: Path, **kwargs) -> None:
+class RepositoryEntry(Option):
+    def __init__(self, path: Path) -> None:
         self.path = path
         # TODO: Add more info
-        children = (Static(Content(path.name).truncate(40)),)
-        super().__init__(*children, **kwargs)
-
-    @on(Click)
-    def action_open_repo(self) -> None:
-        self.query_ancestor(DashboardScreen)._open_repo(self.path)
+        name = path.name
+        # plain slicing is much cheaper than Content.truncate, which measures the cell width of the text
+        display = name if len(name) <= REPO_NAME_WIDTH else name[: REPO_NAME_WIDTH - 1] + "…"
+        super().__init__(Content(display))
 
 
 class CustomDirPicker(SelectDirectory):
@@ -246,20 +360,23 @@ class CustomDirPicker(SelectDirectory):
     @on(Input.Submitted)
     def _select_directory(self, event: Button.Pressed | Input.Submitted) -> None:
         event.stop()
+        location = self.query_one(DirectoryNavigation).location
         match event:
             case Input.Submitted():
                 input_val = Path(event.value)
             case Button.Pressed():
-                input_val = self.query_one(Input).value
-                if not input_val:
-                    self.dismiss(self.query_one(DirectoryNavigation).location)
+                value = self.query_one(Input).value
+                if not value:
+                    self.dismiss(location)
+                    return
 
-                input_val = Path(input_val)
+                input_val = Path(value)
 
         if input_val.is_absolute():
             self.dismiss(input_val)
+            return
 
-        self.dismiss((self.query_one(DirectoryNavigation).location / input_val).resolve())
+        self.dismiss((location / input_val).resolve())
 
 
 class CloneModal(ModalScreen):
@@ -295,7 +412,7 @@ class CloneModal(ModalScreen):
 
     def __init__(self, dashboard: DashboardScreen, default_dir: Path | None = None, **kwargs):
         super().__init__(**kwargs)
-        self.default_dir = default_dir or Path.home()
+        self.default_dir = default_dir or _HOME
         self.dashboard = dashboard
 
     def compose(self) -> ComposeResult:
@@ -310,20 +427,25 @@ class CloneModal(ModalScreen):
                     yield Button("Clone", variant="primary", id="clone-confirm")
                     yield Button("Cancel", variant="error", id="clone-cancel")
 
+    def on_mount(self) -> None:
+        # looked up once, the handlers below use them on every press
+        self._url_input = self.query_one("#repo-url", Input)
+        self._picked_static = self.query_one("#picked-dir", Static)
+
     @on(Button.Pressed, "#pick-dir")
     @work
     async def pick_directory(self) -> None:
         picked: Path | None = await self.app.push_screen_wait(
             CustomDirPicker(title="Select Target Directory for Clone")
         )
-        url = self.query_one("#repo-url", Input).value.strip()
+        url = self._url_input.value.strip()
         # ensure picked dir can be used for cloning
         if picked is None:
             self.app.notify("No directory selected, using default directory.")
             picked = self.default_dir
         else:
-            picked = picked.expanduser().resolve()
-            if picked.exists() and any(picked.iterdir()):
+            # the picker already hands back an absolute path, no need to resolve it again
+            if not _is_empty_dir(picked):
                 # If the directory exists and is not empty, append the repo name to the path
                 if url:
                     picked = picked / url.split("/")[-1]
@@ -339,21 +461,21 @@ class CloneModal(ModalScreen):
                 else:
                     picked = self.default_dir
 
-            self.query_one("#picked-dir", Static).update(str(picked))
+            self._picked_static.update(str(picked))
             self._picked_dir = picked
             return
 
         self._picked_dir = self.default_dir
-        self.query_one("#picked-dir", Static).update(str(self.default_dir))
+        self._picked_static.update(str(self.default_dir))
 
     @on(Button.Pressed, "#clone-confirm")
     async def on_confirm(self) -> None:
-        url = self.query_one("#repo-url", Input).value.strip()
+        url = self._url_input.value.strip()
         target = getattr(self, "_picked_dir", self.default_dir)
 
         if self.check_dir_validity():
             self._picked_dir = target
-            self.query_one("#picked-dir", Static).update(str(target))
+            self._picked_static.update(str(target))
         else:
             return
 
@@ -362,7 +484,8 @@ class CloneModal(ModalScreen):
                 title="Missing info", message="Please provide both URL and target directory.", severity="warning"
             )
             return
-        target_path = Path(target).expanduser().resolve()
+        # the picker and the home default are already absolute, resolving them again only costs syscalls
+        target_path = target if target.is_absolute() else target.expanduser().resolve()
 
         self.dismiss((url, target_path))
 
@@ -372,7 +495,7 @@ class CloneModal(ModalScreen):
         if self.check_dir_validity():
             # If the directory is valid, we can dismiss the modal
             self._picked_dir = self.default_dir
-            self.query_one("#picked-dir", Static).update(str(self.default_dir))
+            self._picked_static.update(str(self.default_dir))
         self.dismiss(None)
 
     def check_dir_validity(self) -> bool:
@@ -380,7 +503,7 @@ class CloneModal(ModalScreen):
         Check if the directory is valid for cloning and notify the user if it is not.
         """
         path = getattr(self, "_picked_dir", self.default_dir)
-        ret = (not path.exists()) or (path.is_dir() and not any(path.iterdir()))
+        ret = _is_empty_dir(path)
 
         if not ret:
             self.app.notify(
@@ -424,19 +547,32 @@ class CloneProgressModal(ModalScreen):
         def __init__(self, parent: CloneProgressModal, credentials=None, certificate_check=None):
             super().__init__(credentials, certificate_check)
             self.parent = parent
+            # transfer_progress runs for every object received, so look the bar up once
+            self.progress = parent.query_one("#clone-progress-bar", ProgressBar)
+            self._last_update = 0.0
 
         def transfer_progress(self, stats):
-            progress = self.parent.query_one("#clone-progress-bar", ProgressBar)
-            if progress.total == stats.total_objects:
-                progress.update(progress=stats.received_objects)
+            now = time.monotonic()
+            done = stats.received_objects == stats.total_objects
+            if not done and now - self._last_update < CLONE_PROGRESS_INTERVAL:
+                return
+            self._last_update = now
+            # this runs on the clone thread, widgets must only be touched from the event loop
+            self.parent.app.call_from_thread(self._update_progress, stats.received_objects, stats.total_objects)
+
+        def _update_progress(self, received: int, total: int) -> None:
+            if self.progress.total == total:
+                self.progress.update(progress=received)
             else:
-                progress.update(progress=stats.received_objects, total=stats.total_objects)
+                self.progress.update(progress=received, total=total)
 
     def __init__(self, repo_url: str, target_path: Path, **kwargs):
         super().__init__(**kwargs)
         self.repo_url = repo_url
         self.target_path = target_path
         self.clone_task = None
+        # a thread of its own, so a long clone doesn't hold on to a slot of the shared default executor
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="git-clone")
 
     def compose(self) -> ComposeResult:
         with Vertical(id="clone-progress-modal"):
@@ -466,6 +602,12 @@ class CloneProgressModal(ModalScreen):
             self.dismiss(repo)
 
     async def _perform_clone(self):
-        return await asyncio.to_thread(
+        loop = asyncio.get_running_loop()
+        clone = functools.partial(
             pygit2.clone_repository, self.repo_url, str(self.target_path), callbacks=self.CustomCallBack(self)
         )
+        try:
+            return await loop.run_in_executor(self._executor, clone)
+        finally:
+            # don't wait here, a cancelled clone keeps running on its thread until libgit2 returns
+            self._executor.shutdown(wait=False)